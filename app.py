@@ -3,11 +3,20 @@ from flask import Flask, request, jsonify
 import json
 from controllers.medical_controller import EnhancedMedicalController
 from models.medical_models import MedicalQueryResult, PatientInfo
+from services.query_stats_service import QueryStatsService
 import asyncio
+import atexit
+import gzip
 import os
+import threading
 from dotenv import load_dotenv
 from utils.logger import SystemLogger
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # 加载环境变量
 load_dotenv()
 
@@ -16,9 +25,75 @@ logger = SystemLogger("medical_api")
 
 app = Flask(__name__)
 medical_controller = EnhancedMedicalController()
+# 查询统计来自共享的历史文件，多worker部署时各进程结果一致
+stats_service = QueryStatsService()
+
+# 常驻事件循环：在后台线程中运行，避免每个请求创建和销毁事件循环
+_LOOP = asyncio.new_event_loop()
+threading.Thread(target=_LOOP.run_forever, name="medical-event-loop", daemon=True).start()
+atexit.register(lambda: _LOOP.call_soon_threadsafe(_LOOP.stop))
+
+def _run_async(coro):
+    """在常驻事件循环中执行协程并等待结果（可被多个请求线程并发调用）"""
+    return asyncio.run_coroutine_threadsafe(coro, _LOOP).result()
+
+# 固定响应体，模块加载时构建一次
+HEALTH_BODY = {
+    'status': 'healthy',
+    'version': 'v1.0',
+    'service': 'medical-ai-system'
+}
+
+SYSTEM_INFO_BODY = {
+    'name': '智能医疗导诊系统',
+    'version': '1.0.0',
+    'description': '基于多知识库和AI的医疗导诊服务',
+    'features': [
+        '症状匹配',
+        '医疗建议生成',
+        '风险评估',
+        '安全检测'
+    ],
+    'llm_provider': 'DeepSeek',
+    'data_sources': ['symptom.json', 'guideline.json', 'disease_info.json']
+}
+
+EMPTY_STATS_BODY = {
+    'counts': {'normal': 0, 'malicious_or_error': 0, 'non_medical': 0, 'total': 0},
+    'durations_ms': {'count': 0, 'avg': 0.0, 'p95': 0.0, 'max': 0.0}
+}
+
+# 超过该字节数且客户端支持时，响应体使用gzip压缩
+GZIP_MIN_SIZE = 1024
+
+def _dumps_json(obj) -> bytes:
+    """序列化为UTF-8 JSON字节（优先orjson）"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+# 固定响应体的序列化结果，避免每次请求（包括统计失败时）重复序列化
+HEALTH_JSON = _dumps_json(HEALTH_BODY)
+SYSTEM_INFO_JSON = _dumps_json(SYSTEM_INFO_BODY)
+EMPTY_STATS_JSON = _dumps_json(EMPTY_STATS_BODY)
+EMPTY_LIST_JSON = b'[]'
+
+def _json_response(obj, status: int = 200):
+    """序列化JSON响应，较大的响应体按客户端Accept-Encoding进行gzip压缩"""
+    return _json_bytes_response(_dumps_json(obj), status)
+
+def _json_bytes_response(body: bytes, status: int = 200):
+    """以已序列化的JSON字节构建响应"""
+    response = app.response_class(body, status=status, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    # 按q值判断，"gzip;q=0"表示客户端明确拒绝gzip
+    if len(body) >= GZIP_MIN_SIZE and request.accept_encodings.quality('gzip') > 0:
+        response.set_data(gzip.compress(body, compresslevel=5))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
 
 @app.route('/api/medical/query', methods=['POST'])
-async def medical_query():
+def medical_query():
     """医疗查询API"""
     try:
         data = request.get_json()
@@ -36,7 +111,7 @@ async def medical_query():
         
         # 处理查询
         client_start_ts = data.get('client_start_ts')
-        result = await medical_controller.process_query(symptom_text, patient_info, client_start_ts)
+        result = _run_async(medical_controller.process_query(symptom_text, patient_info, client_start_ts))
         
         # 返回结构化响应
         return jsonify(result.dict())
@@ -49,7 +124,7 @@ async def medical_query():
         return jsonify(error_result.dict()), 500
 
 @app.route('/api/medical/structured', methods=['POST'])
-async def structured_medical_query():
+def structured_medical_query():
     """结构化医疗查询API"""
     try:
         data = request.get_json()
@@ -73,10 +148,10 @@ async def structured_medical_query():
             return jsonify(error_result.dict()), 400
         
         # 处理查询
-        result = await medical_controller.process_query(
+        result = _run_async(medical_controller.process_query(
             data.get('symptom', ''),
             patient_info.dict()
-        )
+        ))
         
         return jsonify(result.dict())
         
@@ -90,93 +165,119 @@ async def structured_medical_query():
 @app.route('/health', methods=['GET'])
 def health_check():
     """健康检查API"""
-    return jsonify({
-        'status': 'healthy',
-        'version': 'v1.0',
-        'service': 'medical-ai-system'
-    })
+    return _json_bytes_response(HEALTH_JSON)
 
 @app.route('/api/info', methods=['GET'])
 def system_info():
     """系统信息API"""
-    return jsonify({
-        'name': '智能医疗导诊系统',
-        'version': '1.0.0',
-        'description': '基于多知识库和AI的医疗导诊服务',
-        'features': [
-            '症状匹配',
-            '医疗建议生成',
-            '风险评估',
-            '安全检测'
-        ],
-        'llm_provider': 'DeepSeek',
-        'data_sources': ['symptom.json', 'guideline.json', 'disease_info.json']
-    })
+    return _json_bytes_response(SYSTEM_INFO_JSON)
+
+# 查询历史文件路径，模块加载时计算一次
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+_LOGS_HISTORY_PATH = os.path.join(_BASE_DIR, 'logs', 'query_history.json')
+_ROOT_HISTORY_PATH = os.path.join(_BASE_DIR, 'query_history.json')
+_NDJSON_HISTORY_PATH = os.path.join(_BASE_DIR, 'logs', 'query_history.ndjson')
+
+# 旧版JSON数组文件缓存：按(路径, mtime, 大小)判断是否需要重新解析
+_legacy_cache = {'key': None, 'entries': []}
+# 追加写入的NDJSON文件缓存：文件只追加，记录已解析到的字节偏移，之后只解析新增部分
+_ndjson_cache = {'ino': None, 'offset': 0, 'entries': []}
+_history_lock = threading.Lock()
+
+def _loads():
+    return orjson.loads if orjson else json.loads
+
+def _parse_ndjson_lines(data, loads, out):
+    for line in data.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            out.append(loads(line))
+        except ValueError:
+            # 跳过写入中断导致的残缺行
+            continue
+
+def _refresh_legacy_history() -> bool:
+    """刷新旧版历史缓存，文件有变化时返回True"""
+    path = _LOGS_HISTORY_PATH if os.path.exists(_LOGS_HISTORY_PATH) else _ROOT_HISTORY_PATH
+    try:
+        st = os.stat(path)
+    except OSError:
+        key, entries = None, []
+    else:
+        key = (path, st.st_mtime_ns, st.st_size)
+        if key == _legacy_cache['key']:
+            return False
+        with open(path, 'rb') as f:
+            obj = _loads()(f.read())
+        entries = obj if isinstance(obj, list) else []
+    changed = key != _legacy_cache['key']
+    _legacy_cache['key'], _legacy_cache['entries'] = key, entries
+    return changed
+
+def _refresh_ndjson_history():
+    """刷新NDJSON历史缓存
+
+    Returns:
+        (新增记录, 是否重新加载)；文件被替换或截断时从头重新解析
+    """
+    try:
+        st = os.stat(_NDJSON_HISTORY_PATH)
+    except OSError:
+        reloaded = bool(_ndjson_cache['entries'])
+        _ndjson_cache.update(ino=None, offset=0, entries=[])
+        return [], reloaded
+    reloaded = st.st_ino != _ndjson_cache['ino'] or st.st_size < _ndjson_cache['offset']
+    if reloaded:
+        _ndjson_cache.update(ino=st.st_ino, offset=0, entries=[])
+    if st.st_size == _ndjson_cache['offset']:
+        return [], reloaded
+    with open(_NDJSON_HISTORY_PATH, 'rb') as f:
+        f.seek(_ndjson_cache['offset'])
+        data = f.read()
+    # 只消费完整的行，正在写入的最后一行留到下次读取
+    end = data.rfind(b'\n') + 1
+    new_entries = []
+    _parse_ndjson_lines(data[:end], _loads(), new_entries)
+    _ndjson_cache['offset'] += end
+    _ndjson_cache['entries'].extend(new_entries)
+    return new_entries, reloaded
+
+def _sync_history():
+    """刷新历史缓存并同步统计，需持有_history_lock"""
+    legacy_changed = _refresh_legacy_history()
+    new_entries, ndjson_reloaded = _refresh_ndjson_history()
+    if legacy_changed or ndjson_reloaded:
+        stats_service.reset()
+        stats_service.extend(_legacy_cache['entries'])
+        stats_service.extend(_ndjson_cache['entries'])
+    elif new_entries:
+        stats_service.extend(new_entries)
+
+def _load_history_entries():
+    """读取完整查询历史：旧版JSON数组文件 + 追加写入的NDJSON文件"""
+    with _history_lock:
+        _sync_history()
+        # 返回新列表，避免调用方修改缓存内容
+        return _legacy_cache['entries'] + _ndjson_cache['entries']
 
 @app.route('/api/history', methods=['GET'])
 def get_history():
     try:
-        base = os.path.dirname(os.path.abspath(__file__))
-        logs_path = os.path.join(base, 'logs', 'query_history.json')
-        root_path = os.path.join(base, 'query_history.json')
-        path = logs_path if os.path.exists(logs_path) else (root_path if os.path.exists(root_path) else logs_path)
-        if not os.path.exists(path):
-            return jsonify([])
-        with open(path, 'r', encoding='utf-8') as f:
-            obj = json.load(f)
-            return jsonify(obj if isinstance(obj, list) else [])
+        return _json_response(_load_history_entries())
     except Exception:
-        return jsonify([])
+        return _json_bytes_response(EMPTY_LIST_JSON)
 
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
     try:
-        base = os.path.dirname(os.path.abspath(__file__))
-        logs_path = os.path.join(base, 'logs', 'query_history.json')
-        root_path = os.path.join(base, 'query_history.json')
-        path = logs_path if os.path.exists(logs_path) else (root_path if os.path.exists(root_path) else logs_path)
-        entries = []
-        if os.path.exists(path):
-            with open(path, 'r', encoding='utf-8') as f:
-                obj = json.load(f)
-                entries = obj if isinstance(obj, list) else []
-        normal = 0
-        malicious = 0
-        non_medical = 0
-        durations = []
-        for e in entries:
-            r = e.get('result', {})
-            s = r.get('status')
-            if s == 'success':
-                normal += 1
-            elif s == 'no_match':
-                non_medical += 1
-            elif s == 'failed' or s == 'error':
-                malicious += 1
-            d = e.get('total_duration_ms') or e.get('duration_ms') or e.get('server_duration_ms')
-            if isinstance(d, (int, float)):
-                durations.append(float(d))
-        durations_sorted = sorted(durations)
-        n = len(durations_sorted)
-        avg = sum(durations_sorted) / n if n else 0.0
-        p95 = durations_sorted[int(0.95 * (n - 1))] if n else 0.0
-        mx = durations_sorted[-1] if n else 0.0
-        return jsonify({
-            'counts': {
-                'normal': normal,
-                'malicious_or_error': malicious,
-                'non_medical': non_medical,
-                'total': len(entries)
-            },
-            'durations_ms': {
-                'count': n,
-                'avg': round(avg, 2),
-                'p95': round(p95, 2),
-                'max': round(mx, 2)
-            }
-        })
+        # 只解析NDJSON新增部分并增量计入统计，无新数据时直接返回缓存的统计结果
+        with _history_lock:
+            _sync_history()
+        return _json_response(stats_service.snapshot())
     except Exception:
-        return jsonify({'counts': {'normal': 0, 'malicious_or_error': 0, 'non_medical': 0, 'total': 0}, 'durations_ms': {'count': 0, 'avg': 0.0, 'p95': 0.0, 'max': 0.0}})
+        return _json_bytes_response(EMPTY_STATS_JSON)
 
 if __name__ == '__main__':
     # 第一版本直接运行，无需复杂部署
@@ -11,9 +11,18 @@ from services.smart_security_service import SmartSecurityService
 from services.symptom_matcher import SymptomMatcher
 from models.medical_models import (
     PatientInfo, SymptomInfo, GuidelineInfo, RiskInfo,
-    MedicalAdviceRequest, MedicalQueryResult, UrgencyLevel
+    MedicalAdviceRequest, MedicalQueryResult
 )
-from utils.enhanced_logger import logger, log_process_step
+from utils.enhanced_logger import logger
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 查询历史路径，模块加载时计算一次
+_LOGS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs")
+_HISTORY_NDJSON_PATH = os.path.join(_LOGS_DIR, "query_history.ndjson")
 
 class EnhancedMedicalController:
     """增强的医疗控制器，集成Pydantic验证"""
@@ -25,7 +34,7 @@ class EnhancedMedicalController:
         self.symptom_matcher = SymptomMatcher()  # 新增症状匹配器
         logger.info("EnhancedMedicalController initialized successfully")
     
-    async def process_query(self, symptom_text: str, patient_info: Dict[str, Any], client_start_ts: str = None) -> MedicalQueryResult:
+    async def process_query(self, symptom_text: str, patient_info: Dict[str, Any], client_start_ts=None) -> MedicalQueryResult:
         """处理医疗查询，返回结构化结果"""
         start_perf = time.perf_counter()
         logger.log_process_step("process_query", "started", {
@@ -58,16 +67,7 @@ class EnhancedMedicalController:
                         if intent else "输入内容不符合医疗咨询要求，请重新输入"
                     )
                 )
-                self._append_query_history({
-                    "timestamp": datetime.now().isoformat(),
-                    "symptom": symptom_text,
-                    "patient_info": patient_info,
-                    "result": result_model.dict(),
-                    "server_duration_ms": int((time.perf_counter() - start_perf) * 1000),
-                    "duration_ms": int((time.perf_counter() - start_perf) * 1000),
-                    "client_start_ts": client_start_ts,
-                    "total_duration_ms": self._calc_total_duration_ms(client_start_ts)
-                })
+                self._record_query_history(symptom_text, patient_info, result_model, start_perf, client_start_ts)
                 return result_model
             
             # 2.1 进一步验证是否为医疗咨询
@@ -81,16 +81,7 @@ class EnhancedMedicalController:
                         if intent else "请用医疗症状进行描述（如：头痛、发烧、咳嗽、胸痛等），避免角色扮演或系统指令类文本"
                     )
                 )
-                self._append_query_history({
-                    "timestamp": datetime.now().isoformat(),
-                    "symptom": symptom_text,
-                    "patient_info": patient_info,
-                    "result": result_model.dict(),
-                    "server_duration_ms": int((time.perf_counter() - start_perf) * 1000),
-                    "duration_ms": int((time.perf_counter() - start_perf) * 1000),
-                    "client_start_ts": client_start_ts,
-                    "total_duration_ms": self._calc_total_duration_ms(client_start_ts)
-                })
+                self._record_query_history(symptom_text, patient_info, result_model, start_perf, client_start_ts)
                 return result_model
             
             # 3. 症状匹配 - 使用新的症状匹配器
@@ -214,16 +205,7 @@ class EnhancedMedicalController:
             })
             
             logger.info(f"查询处理成功: {result.disease_name} (置信度: {result.supplementary_info.get('confidence', 0)})")
-            self._append_query_history({
-                "timestamp": datetime.now().isoformat(),
-                "symptom": symptom_text,
-                "patient_info": patient_info,
-                "result": result.dict(),
-                "server_duration_ms": int((time.perf_counter() - start_perf) * 1000),
-                "duration_ms": int((time.perf_counter() - start_perf) * 1000),
-                "client_start_ts": client_start_ts,
-                "total_duration_ms": self._calc_total_duration_ms(client_start_ts)
-            })
+            self._record_query_history(symptom_text, patient_info, result, start_perf, client_start_ts)
             return result
             
         except Exception as e:
@@ -291,35 +273,46 @@ class EnhancedMedicalController:
         
         return request
 
+    def _record_query_history(self, symptom_text: str, patient_info: Dict[str, Any],
+                              result_model: MedicalQueryResult, start_perf: float, client_start_ts=None):
+        """构建并追加查询历史记录，服务耗时只计算一次"""
+        server_end_ms = time.time() * 1000
+        duration_ms = int((time.perf_counter() - start_perf) * 1000)
+        entry = {
+            "timestamp": datetime.now().isoformat(),
+            "symptom": symptom_text,
+            "patient_info": patient_info,
+            "result": result_model.dict(),
+            "server_duration_ms": duration_ms,
+            "duration_ms": duration_ms,
+            "client_start_ts": client_start_ts,
+            "total_duration_ms": self._calc_total_duration_ms(client_start_ts, server_end_ms)
+        }
+        self._append_query_history(entry)
+
     def _append_query_history(self, entry: dict):
+        """追加一条查询记录（NDJSON，每条记录一次write，无需读取和重写整个文件）"""
         try:
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            project_root = os.path.dirname(current_dir)
-            logs_dir = os.path.join(project_root, "logs")
-            os.makedirs(logs_dir, exist_ok=True)
-            path = os.path.join(logs_dir, "query_history.json")
-            tmp_path = path + ".tmp"
-            data = []
-            if os.path.exists(path):
-                try:
-                    with open(path, "r", encoding="utf-8") as f:
-                        obj = json.load(f)
-                        if isinstance(obj, list):
-                            data = obj
-                except Exception:
-                    data = []
-            data.append(entry)
-            with open(tmp_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            os.replace(tmp_path, path)
+            os.makedirs(_LOGS_DIR, exist_ok=True)
+            if orjson is not None:
+                line = orjson.dumps(entry) + b"\n"
+            else:
+                line = json.dumps(entry, ensure_ascii=False).encode("utf-8") + b"\n"
+            with open(_HISTORY_NDJSON_PATH, "ab") as f:
+                f.write(line)
         except Exception as e:
             logger.warning(str(e))
 
-    def _calc_total_duration_ms(self, client_start_ts: str):
+    def _calc_total_duration_ms(self, client_start_ts, server_end_ms: float = None):
+        """计算客户端发起到服务端完成的总耗时；client_start_ts为毫秒时间戳，兼容旧版ISO字符串"""
         try:
             if not client_start_ts:
                 return None
+            if server_end_ms is None:
+                server_end_ms = time.time() * 1000
+            if isinstance(client_start_ts, (int, float)):
+                return int(server_end_ms - client_start_ts)
             cs = datetime.fromisoformat(client_start_ts)
-            return int((datetime.now() - cs).total_seconds() * 1000)
+            return int(server_end_ms - cs.timestamp() * 1000)
         except Exception:
             return None
@@ -1,7 +1,12 @@
 import json
 import time
-from datetime import datetime
 import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 CASES = [
     {
@@ -41,19 +46,29 @@ CASES = [
     },
 ]
 
+# 所有用例复用同一连接池，避免每次请求重新建立TCP连接
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+SESSION.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
+def _body(resp):
+    """解析响应JSON（优先orjson），非对象响应按空结果处理"""
+    data = orjson.loads(resp.content) if orjson is not None else resp.json()
+    return data if isinstance(data, dict) else {}
+
 def run_case(api_url, case):
     payload = {
         "symptom": case["text"],
         "patient_info": {"age": 30, "gender": "男", "special_conditions": ""},
-        "client_start_ts": datetime.now().isoformat()
+        "client_start_ts": int(time.time() * 1000)
     }
     t0 = time.perf_counter()
     try:
-        r = requests.post(f"{api_url}/api/medical/query", json=payload, timeout=30)
+        r = SESSION.post(f"{api_url}/api/medical/query", json=payload, timeout=30)
         dt = int((time.perf_counter() - t0) * 1000)
         if r.status_code != 200:
             return {"id": case["id"], "http": r.status_code, "duration_ms": dt, "pass": False, "result": {}}
-        res = r.json()
+        res = _body(r)
         if "allowed_status" in case["expect"]:
             passed = res.get("status") in case["expect"]["allowed_status"]
         else:
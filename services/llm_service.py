@@ -1,6 +1,5 @@
 """LLM服务 - DeepSeek集成和Pydantic验证"""
 import os
-import time
 import json
 from langchain.chat_models import ChatOpenAI
 from langchain.schema import HumanMessage, SystemMessage
@@ -9,6 +8,11 @@ from models.medical_models import MedicalAdviceRequest, MedicalAdviceResponse
 from utils.output_parsers import MedicalOutputParser
 from utils.enhanced_logger import logger
 
+# 固定的系统消息，模块加载时构建一次，各次调用共享（消息对象只读）
+_ADVICE_SYSTEM_MESSAGE = SystemMessage(content="你是一个专业的医疗导诊AI助手")
+_INTENT_SYSTEM_MESSAGE = SystemMessage(content="你是一个专业的医疗语义分析器，只输出JSON")
+_MULTI_CANDIDATE_SYSTEM_MESSAGE = SystemMessage(content="你是一个专业的医疗导诊AI助手，只输出JSON")
+
 class EnhancedLLMService:
     """增强的LLM服务，集成Pydantic验证和输出解析"""
     
@@ -145,7 +149,7 @@ class EnhancedLLMService:
             
             response = await self.llm.agenerate([
                 [
-                    SystemMessage(content="你是一个专业的医疗导诊AI助手"),
+                    _ADVICE_SYSTEM_MESSAGE,
                     HumanMessage(content=prompt)
                 ]
             ])
@@ -251,7 +255,7 @@ class EnhancedLLMService:
             logger.log_llm_call(prompt=prompt, response="", model=self.model_name, tokens_used=None, duration=None)
             logger.start_timer("llm_intent_call")
             response = await self.llm.agenerate([[
-                SystemMessage(content="你是一个专业的医疗语义分析器，只输出JSON"),
+                _INTENT_SYSTEM_MESSAGE,
                 HumanMessage(content=prompt)
             ]])
             duration = logger.end_timer("llm_intent_call")
@@ -308,7 +312,7 @@ class EnhancedLLMService:
             logger.start_timer("llm_multi_candidates")
             response = await self.llm.agenerate([
                 [
-                    SystemMessage(content="你是一个专业的医疗导诊AI助手，只输出JSON"),
+                    _MULTI_CANDIDATE_SYSTEM_MESSAGE,
                     HumanMessage(content=prompt)
                 ]
             ])
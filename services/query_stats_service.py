@@ -0,0 +1,97 @@
+"""查询统计服务 - 随历史记录增量更新统计，查询时直接返回缓存结果"""
+import threading
+from collections import deque
+from typing import Dict, Any, Iterable
+
+# P95只基于最近的耗时样本计算，内存与计算量有上界
+P95_WINDOW = 1000
+
+# 状态 -> 计数桶，未知状态落入None桶（只计入总数）
+_STATUS_BUCKET = {
+    'success': 'normal',
+    'no_match': 'non_medical',
+    'failed': 'malicious',
+    'error': 'malicious',
+}
+
+_NUM = (int, float)
+
+
+def _duration(entry: Dict[str, Any]):
+    """取记录耗时（毫秒），无法识别时返回None"""
+    d = entry.get('total_duration_ms')
+    if d is None:
+        d = entry.get('duration_ms')
+        if d is None:
+            d = entry.get('server_duration_ms')
+    if type(d) in _NUM:
+        return float(d)
+    if isinstance(d, str):
+        # 旧历史中可能以字符串记录耗时
+        try:
+            return float(d)
+        except ValueError:
+            return None
+    return None
+
+
+class QueryStatsService:
+    """查询统计聚合器
+
+    状态计数、耗时条数、平均值与最大值覆盖全部历史；P95基于最近window条耗时。
+    每条记录只处理一次，snapshot在没有新记录时直接返回上次结果。
+    """
+
+    def __init__(self, window: int = P95_WINDOW):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=window)
+        self.reset()
+
+    def reset(self):
+        """清空统计（历史文件被替换时重新累计）"""
+        with self._lock:
+            self._total = 0
+            self._counts = {'normal': 0, 'non_medical': 0, 'malicious': 0, None: 0}
+            self._n = 0
+            self._sum = 0.0
+            self._max = 0.0
+            self._recent.clear()
+            self._snapshot = None
+
+    def extend(self, entries: Iterable[Dict[str, Any]]):
+        """计入一批新的历史记录"""
+        with self._lock:
+            for entry in entries:
+                self._total += 1
+                self._counts[_STATUS_BUCKET.get((entry.get('result') or {}).get('status'))] += 1
+                d = _duration(entry)
+                if d is None:
+                    continue
+                self._n += 1
+                self._sum += d
+                if d > self._max:
+                    self._max = d
+                self._recent.append(d)
+            self._snapshot = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """返回当前统计结果"""
+        with self._lock:
+            if self._snapshot is None:
+                recent = sorted(self._recent)
+                p95 = recent[int(0.95 * (len(recent) - 1))] if recent else 0.0
+                self._snapshot = {
+                    'counts': {
+                        'normal': self._counts['normal'],
+                        'malicious_or_error': self._counts['malicious'],
+                        'non_medical': self._counts['non_medical'],
+                        'total': self._total
+                    },
+                    'durations_ms': {
+                        'count': self._n,
+                        'avg': round(self._sum / self._n, 2) if self._n else 0.0,
+                        'p95': round(p95, 2),
+                        'max': round(self._max, 2)
+                    }
+                }
+            return self._snapshot
@@ -1,6 +1,5 @@
 """安全服务 - 输入验证和风险检测"""
 import re
-from typing import List
 from utils.logger import logger
 
 class SecurityService:
@@ -1,5 +1,4 @@
 """症状匹配服务 - 基于关键词和相似度匹配"""
-import re
 from typing import Dict, Any, List
 from utils.enhanced_logger import logger
 
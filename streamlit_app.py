@@ -1,10 +1,30 @@
 """Streamlit前端界面 - 医疗导诊系统"""
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
+import html
 import os
+import functools
+import gzip
+import time
 from typing import List, Dict
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson
+
+    def _jdumps(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+
+    _jloads = orjson.loads
+except ImportError:
+    def _jdumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+    _jloads = json.loads
 
 # 页面配置
 st.set_page_config(
@@ -15,7 +35,7 @@ st.set_page_config(
 )
 
 # 样式设置
-st.markdown("""
+_CSS = """
 <style>
     .main-header {
         font-size: 2.5rem;
@@ -45,51 +65,196 @@ st.markdown("""
         margin: 1rem 0;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+# 样式需在每次rerun时重新输出（Streamlit按rerun重建页面元素）
+st.markdown(_CSS, unsafe_allow_html=True)
 
 # 标题
 st.markdown('<h1 class="main-header">🤖 智能医疗导诊系统</h1>', unsafe_allow_html=True)
 
+@st.cache_resource
+def get_session() -> requests.Session:
+    """复用HTTP连接池，避免每次请求重新建立连接"""
+    session = requests.Session()
+    session.headers.update({"Accept-Encoding": "gzip"})
+    # 只重试连接失败和网关类错误；POST非幂等，读超时不重试（read=False时原样抛出ReadTimeout）
+    retry = Retry(
+        total=2,
+        connect=2,
+        read=False,
+        status_forcelist=[502, 503, 504],
+        allowed_methods=frozenset(["GET", "POST"]),
+        backoff_factor=0.3,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def _fetch_service_history(session: requests.Session, api_url: str) -> List[Dict]:
+    resp = session.get(f"{api_url}/api/history", timeout=HISTORY_TIMEOUT)
+    resp.raise_for_status()
+    data = _jloads(resp.content)
+    return data if isinstance(data, list) else []
+
+# 服务端统计缓存秒数，统计数据允许短暂滞后
+STATS_CACHE_TTL = float(os.getenv("STATS_CACHE_TTL", "10"))
+
+@st.cache_data(ttl=STATS_CACHE_TTL, show_spinner=False)
+def _fetch_stats(api_url: str) -> Dict:
+    # 请求失败时抛出异常，异常结果不会被缓存
+    resp = get_session().get(f"{api_url}/api/stats", timeout=8)
+    resp.raise_for_status()
+    return _jloads(resp.content)
+
+HISTORY_PAGE_SIZE = 20
+GZIP_MAGIC = b"\x1f\x8b"
+# 服务历史请求的(连接超时, 读取超时)，连接失败时尽快回退到本地历史
+HISTORY_TIMEOUT = (1.0, 8)
+# (连接超时, 读取超时)，单位秒
+QUERY_TIMEOUT = (3.05, 27)
+
+_RESULT_BOX_CLASS = {"success": "success-box", "no_match": "warning-box"}
+_URGENCY_COLOR = {"高": "🔴", "中": "🟡", "低": "🟢", "未知": "⚪"}
+
+def _esc(text) -> str:
+    """转义为HTML并将换行转为<br>；空行会提前结束markdown中的HTML块，导致后续内容按markdown解析"""
+    return html.escape(str(text)).replace("\r\n", "\n").replace("\n", "<br>")
+
+def _fmt_text(title: str, text) -> str:
+    return f"<b>{title}</b><p>{_esc(text)}</p>"
+
+def _fmt_list(title: str, items) -> str:
+    return f"<b>{title}</b><ul>" + "".join(f"<li>{_esc(x)}</li>" for x in items) + "</ul>"
+
+def _result_body_html(result: Dict) -> str:
+    """将查询结果渲染为单段HTML，整块结果只需一次st.markdown"""
+    status = result.get('status')
+    if status == 'no_match':
+        return (f"<p>{_esc(result.get('error_message'))}</p>"
+                "<p>💡 请尝试更详细地描述症状，例如：头痛的位置、持续时间、伴随症状等</p>")
+    if status != 'success':
+        return f"<p>{_esc(result.get('error_message'))}</p>"
+    urgency = result.get('urgency', '未知')
+    fragments = [
+        _fmt_text("诊断结果", result.get('disease_name')),
+        _fmt_text("紧急程度", f"{_URGENCY_COLOR.get(urgency, '⚪')} {urgency}"),
+    ]
+    advice_data = result['_advice_parsed']
+    fragments.append("<h4>建议与处理</h4>")
+    fragments.append(f"<p>{_esc(advice_data.get('assessment', ''))}</p>")
+    actions = advice_data.get('immediate_actions', [])
+    if actions:
+        fragments.append(_fmt_list("立即行动", actions))
+    fragments.append(_fmt_text("医疗建议", advice_data.get('medical_advice', '')))
+    points = advice_data.get('monitoring_points', [])
+    if points:
+        fragments.append(_fmt_list("监测要点", points))
+    if advice_data.get('emergency_handling'):
+        fragments.append(_fmt_text("紧急处理", advice_data.get('emergency_handling')))
+    supp = result.get('supplementary_info') or {}
+    multi = supp.get('multi_analysis') or {}
+    probs = multi.get('probabilities') or []
+    if probs:
+        id_name = result['_id_name_map']
+        fragments.append(_fmt_list("候选疾病概率分布", (
+            f"{pr.get('disease_name') or id_name.get(pr.get('disease_id')) or pr.get('disease_id')}: {pr.get('probability')}%"
+            for pr in probs
+        )))
+        if multi.get('advice'):
+            fragments.append(_fmt_text("综合建议", multi.get('advice')))
+        if multi.get('notes'):
+            fragments.append(_fmt_text("综合注意事项", multi.get('notes')))
+    best = multi.get('best_candidate')
+    if best:
+        bg = best.get('guideline') or {}
+        br = best.get('risk') or {}
+        fragments.append(_fmt_text("最大概率病情", f"{best.get('disease_name')}（{best.get('probability')}%）"))
+        fragments.append(_fmt_text("该病情的建议措施", bg.get('recommended_action', '建议就医')))
+        fragments.append(_fmt_text("该病情的注意事项", br.get('special_notes', '暂无')))
+    return "\n".join(fragments)
+
+@functools.lru_cache(maxsize=1)
 def _history_path() -> str:
     current_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(current_dir)
     logs_path = os.path.join(project_root, "logs", "query_history.json")
     root_path = os.path.join(project_root, "query_history.json")
-    if os.path.exists(logs_path):
-        return logs_path
-    if os.path.exists(root_path):
-        return root_path
-    return logs_path
+    # 优先使用gzip压缩文件，兼容旧版明文JSON
+    for candidate in (logs_path + ".gz", logs_path, root_path + ".gz", root_path):
+        if os.path.exists(candidate):
+            return candidate
+    return logs_path + ".gz"
 
-def _read_file_history() -> List[Dict]:
-    path = _history_path()
-    if not os.path.exists(path):
+def _parse_advice(result: Dict) -> Dict:
+    advice = result.get('advice')
+    if not isinstance(advice, str):
+        return advice or {}
+    try:
+        return json.loads(advice)
+    except Exception:
+        return {}
+
+def _prepare_entry(entry: Dict) -> Dict:
+    """预解析advice并构建候选疾病名称索引，缓存在会话中的结果上；仅对需要渲染的条目调用"""
+    result = entry.get('result') or {}
+    if '_advice_parsed' not in result or '_id_name_map' not in result:
+        supp = result.get('supplementary_info') or {}
+        entry['result'] = {
+            **result,
+            '_advice_parsed': _parse_advice(result),
+            '_id_name_map': {c.get('disease_id'): c.get('disease_name') for c in (supp.get('candidates') or [])},
+        }
+    return entry
+
+def _strip_cached(entry: Dict) -> Dict:
+    result = entry.get('result')
+    if not isinstance(result, dict) or not any(k.startswith('_') for k in result):
+        return entry
+    return {**entry, 'result': {k: v for k, v in result.items() if not k.startswith('_')}}
+
+def _load_history_file() -> List[Dict]:
+    """读取本地历史文件，解析失败时抛出异常（不访问session_state，可在工作线程中调用）"""
+    try:
+        with open(_history_path(), "rb") as f:
+            raw = f.read()
+    except FileNotFoundError:
+        # 缓存的路径可能已失效（文件被外部移动或删除），下次读取时重新探测
+        _history_path.cache_clear()
         return []
+    if raw[:2] == GZIP_MAGIC:
+        raw = gzip.decompress(raw)
+    obj = _jloads(raw)
+    return obj if isinstance(obj, list) else []
+
+def _read_file_history() -> List[Dict]:
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            obj = json.load(f)
-            return obj if isinstance(obj, list) else []
+        return _load_history_file()
     except Exception:
         # 解析失败时，不返回空，保持现有会话数据，避免覆盖为0
         return st.session_state.get('query_history', [])
 
 def _write_file_history(data: List[Dict]):
     path = _history_path()
+    if not path.endswith(".gz"):
+        # 旧版明文文件在首次写入时迁移为压缩文件
+        path += ".gz"
     tmp_path = path + ".tmp"
     os.makedirs(os.path.dirname(path), exist_ok=True)
     try:
-        with open(tmp_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        with gzip.open(tmp_path, "wb", compresslevel=3) as f:
+            f.write(_jdumps([_strip_cached(h) for h in data]))
         os.replace(tmp_path, path)
+        _history_path.cache_clear()
     except Exception:
         pass
 
 def _load_history_into_session():
-    file_history = _read_file_history()
-    if file_history:
-        st.session_state.query_history = file_history
-    elif 'query_history' not in st.session_state:
-        st.session_state.query_history = []
+    # 每个会话只读取一次历史文件；之后由会话状态维护，advice解析结果得以跨rerun保留
+    if 'query_history' not in st.session_state:
+        st.session_state.query_history = _read_file_history()
 
 _load_history_into_session()
 
@@ -105,7 +270,7 @@ with st.sidebar:
     st.header("📊 系统信息")
     if st.button("检查服务状态"):
         try:
-            response = requests.get(f"{api_url}/health", timeout=5)
+            response = get_session().get(f"{api_url}/health", timeout=5)
             if response.status_code == 200:
                 st.success("✅ 服务正常运行")
             else:
@@ -157,90 +322,23 @@ with tab1:
                         "gender": gender,
                         "special_conditions": special_conditions
                     },
-                    "client_start_ts": datetime.now().isoformat()
+                    "client_start_ts": int(time.time() * 1000)
                 }
                 with st.spinner("🔍 正在分析症状并生成建议..."):
                     try:
-                        response = None
-                        for attempt in range(2):
-                            try:
-                                response = requests.post(f"{api_url}/api/medical/query", json=payload, timeout=30)
-                                break
-                            except requests.exceptions.RequestException:
-                                if attempt == 0:
-                                    continue
-                                raise
-                        if response and response.status_code == 200:
-                            result = response.json()
-                            if 'query_history' not in st.session_state:
-                                st.session_state.query_history = []
-                            st.session_state.query_history.append({
+                        response = get_session().post(f"{api_url}/api/medical/query", json=payload, timeout=QUERY_TIMEOUT)
+                        if response.status_code == 200:
+                            entry = _prepare_entry({
                                 'timestamp': datetime.now().isoformat(),
                                 'symptom': symptom,
-                                'result': result
+                                'result': _jloads(response.content)
                             })
-                            if result['status'] == 'success':
-                                st.markdown("<div class='success-box'>", unsafe_allow_html=True)
-                                st.success(f"**诊断结果**: {result['disease_name']}")
-                                urgency_color = {"高": "🔴", "中": "🟡", "低": "🟢", "未知": "⚪"}
-                                st.info(f"**紧急程度**: {urgency_color.get(result.get('urgency', '未知'), '⚪')} {result.get('urgency', '未知')}")
-                                advice_data = {}
-                                try:
-                                    advice_data = json.loads(result.get('advice', '{}')) if isinstance(result.get('advice'), str) else (result.get('advice') or {})
-                                except Exception:
-                                    advice_data = {}
-                                st.subheader("建议与处理")
-                                st.write(advice_data.get('assessment', ''))
-                                actions = advice_data.get('immediate_actions', [])
-                                if actions:
-                                    st.markdown("**立即行动**")
-                                    for a in actions:
-                                        st.write(f"- {a}")
-                                st.markdown("**医疗建议**")
-                                st.write(advice_data.get('medical_advice', ''))
-                                points = advice_data.get('monitoring_points', [])
-                                if points:
-                                    st.markdown("**监测要点**")
-                                    for p in points:
-                                        st.write(f"- {p}")
-                                if advice_data.get('emergency_handling'):
-                                    st.markdown("**紧急处理**")
-                                    st.write(advice_data.get('emergency_handling'))
-                                supp = result.get('supplementary_info') or {}
-                                multi = supp.get('multi_analysis') or {}
-                                probs = multi.get('probabilities') or []
-                                if probs:
-                                    st.subheader("候选疾病概率分布")
-                                    id_name = {c.get('disease_id'): c.get('disease_name') for c in (supp.get('candidates') or [])}
-                                    for pr in probs:
-                                        name = pr.get('disease_name') or id_name.get(pr.get('disease_id')) or pr.get('disease_id')
-                                        st.write(f"- {name}: {pr.get('probability')}%")
-                                    if multi.get('advice'):
-                                        st.subheader("综合建议")
-                                        st.write(multi.get('advice'))
-                                    if multi.get('notes'):
-                                        st.subheader("综合注意事项")
-                                        st.write(multi.get('notes'))
-                                best = multi.get('best_candidate')
-                                if best:
-                                    st.subheader("最大概率病情")
-                                    st.write(f"{best.get('disease_name')}（{best.get('probability')}%）")
-                                    bg = best.get('guideline') or {}
-                                    br = best.get('risk') or {}
-                                    st.markdown("**该病情的建议措施**")
-                                    st.write(bg.get('recommended_action', '建议就医'))
-                                    st.markdown("**该病情的注意事项**")
-                                    st.write(br.get('special_notes', '暂无'))
-                                st.markdown("</div>", unsafe_allow_html=True)
-                            elif result['status'] == 'no_match':
-                                st.markdown("<div class='warning-box'>", unsafe_allow_html=True)
-                                st.warning(result['error_message'])
-                                st.info("💡 请尝试更详细地描述症状，例如：头痛的位置、持续时间、伴随症状等")
-                                st.markdown("</div>", unsafe_allow_html=True)
-                            else:
-                                st.markdown("<div class='error-box'>", unsafe_allow_html=True)
-                                st.error(result['error_message'])
-                                st.markdown("</div>", unsafe_allow_html=True)
+                            result = entry['result']
+                            if 'query_history' not in st.session_state:
+                                st.session_state.query_history = []
+                            st.session_state.query_history.append(entry)
+                            cls = _RESULT_BOX_CLASS.get(result['status'], 'error-box')
+                            st.markdown(f"<div class='{cls}'>{_result_body_html(result)}</div>", unsafe_allow_html=True)
                         else:
                             st.error(f"请求失败: HTTP {response.status_code}")
                     except requests.exceptions.Timeout:
@@ -255,26 +353,45 @@ with tab1:
 with tab2:
     st.subheader("📋 查询历史")
     if st.button("🔄 刷新本地历史", key="refresh_history"):
+        # 手动刷新时重新探测历史文件路径，以便发现新出现的高优先级文件
+        _history_path.cache_clear()
         file_history = _read_file_history()
         st.session_state.query_history = file_history
         st.success(f"已刷新，共 {len(st.session_state.query_history)} 条记录")
     if st.button("🔄 从服务刷新历史", key="refresh_service_history"):
-        try:
-            resp = requests.get(f"{api_url}/api/history", timeout=8)
-            if resp.status_code == 200:
-                data = resp.json()
-                st.session_state.query_history = data if isinstance(data, list) else []
+        # 服务请求与本地文件读取并发进行，服务失败时直接使用已读好的本地历史；
+        # 本地读取总会执行完毕（离开with块时等待），服务成功时其结果被丢弃
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            service_future = executor.submit(_fetch_service_history, get_session(), api_url)
+            local_future = executor.submit(_load_history_file)
+            try:
+                data = service_future.result()
+                st.session_state.query_history = data
                 st.success(f"已从服务刷新，共 {len(st.session_state.query_history)} 条记录")
-            else:
-                st.error("服务历史获取失败")
-        except Exception:
-            st.error("无法连接到服务")
+            except Exception as e:
+                st.error("服务历史获取失败" if isinstance(e, requests.exceptions.HTTPError) else "无法连接到服务")
+                try:
+                    local_history = local_future.result()
+                except Exception:
+                    local_history = []
+                # 本地也没有历史时保留当前会话数据，避免覆盖本次会话中尚未保存的查询
+                if local_history:
+                    st.session_state.query_history = local_history
+                    st.info(f"已改用本地历史，共 {len(local_history)} 条记录")
     if not st.session_state.query_history:
         st.info("暂无查询历史")
     else:
-        for i, history in enumerate(reversed(st.session_state.query_history)):
-            with st.expander(f"查询 {len(st.session_state.query_history) - i}: {history['symptom'][:50]}..."):
-                st.write(f"**时间**: {datetime.fromisoformat(history['timestamp']).strftime('%Y-%m-%d %H:%M:%S')}")
+        # 分页渲染，每次rerun只创建当前页的expander
+        n = len(st.session_state.query_history)
+        pages = (n + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE
+        page = st.number_input("页", min_value=1, max_value=max(pages, 1), value=1, key="history_page") - 1
+        start = page * HISTORY_PAGE_SIZE
+        delete_index = None
+        for i in range(start, min(start + HISTORY_PAGE_SIZE, n)):
+            history = st.session_state.query_history[n - 1 - i]
+            with st.expander(f"查询 {n - i}: {history['symptom'][:50]}..."):
+                # ISO时间戳前19位即"YYYY-MM-DDTHH:MM:SS"，直接切片，无需解析再格式化
+                st.write(f"**时间**: {history['timestamp'][:19].replace('T', ' ')}")
                 st.write(f"**症状**: {history['symptom']}")
                 dur = history.get('duration_ms') or history.get('server_duration_ms')
                 if isinstance(dur, (int, float)):
@@ -285,11 +402,8 @@ with tab2:
                 if history['result']['status'] == 'success':
                     st.success(f"诊断: {history['result']['disease_name']}")
                     st.info(f"紧急程度: {history['result']['urgency']}")
-                    advice_data = {}
-                    try:
-                        advice_data = json.loads(history['result'].get('advice', '{}')) if isinstance(history['result'].get('advice'), str) else (history['result'].get('advice') or {})
-                    except Exception:
-                        advice_data = {}
+                    prepared = _prepare_entry(history)['result']
+                    advice_data = prepared['_advice_parsed']
                     st.subheader("建议与处理")
                     st.write(advice_data.get('assessment', ''))
                     actions = advice_data.get('immediate_actions', [])
@@ -312,7 +426,7 @@ with tab2:
                     probs = multi.get('probabilities') or []
                     if probs:
                         st.subheader("候选疾病概率分布")
-                        id_name = {c.get('disease_id'): c.get('disease_name') for c in (supp.get('candidates') or [])}
+                        id_name = prepared['_id_name_map']
                         for pr in probs:
                             name = pr.get('disease_name') or id_name.get(pr.get('disease_id')) or pr.get('disease_id')
                             st.write(f"- {name}: {pr.get('probability')}%")
@@ -335,9 +449,12 @@ with tab2:
                 else:
                     st.error(history['result']['error_message'])
                 if st.button(f"删除", key=f"delete_{i}"):
-                    st.session_state.query_history.pop(len(st.session_state.query_history) - 1 - i)
+                    delete_index = n - 1 - i
                     st.success("已删除，刷新以同步本地文件")
-                    _write_file_history(st.session_state.query_history)
+        # 每次rerun最多只有一个删除按钮被点击；渲染结束后再删除，避免循环中下标错位
+        if delete_index is not None:
+            st.session_state.query_history.pop(delete_index)
+            _write_file_history(st.session_state.query_history)
 
 with tab3:
     st.subheader("🔒 恶意与正常统计")
@@ -345,40 +462,39 @@ with tab3:
     malicious = 0
     normal = 0
     non_medical = 0
+    # 一次遍历同时完成计数并收集恶意样例
+    malicious_samples = []
     for h in hist:
         res = h.get('result', {})
         status = res.get('status')
-        msg = res.get('error_message') or ""
         if status == 'success':
             normal += 1
         elif status == 'no_match':
             non_medical += 1
         else:
             malicious += 1
+            if status == 'failed':
+                malicious_samples.append(h)
     colm1, colm2, colm3 = st.columns(3)
     colm1.metric("正常次数", normal)
     colm2.metric("恶意/不合规次数", malicious)
     colm3.metric("非医疗表达次数", non_medical)
     try:
-        stats_resp = requests.get(f"{api_url}/api/stats", timeout=8)
-        if stats_resp.status_code == 200:
-            stats = stats_resp.json()
-            d = stats.get('durations_ms', {})
-            st.subheader("⏱️ 性能统计")
-            st.write({
-                "样本数": d.get('count', 0),
-                "平均耗时ms": d.get('avg', 0.0),
-                "P95耗时ms": d.get('p95', 0.0),
-                "最大耗时ms": d.get('max', 0.0)
-            })
+        stats = _fetch_stats(api_url)
+        d = stats.get('durations_ms', {})
+        st.subheader("⏱️ 性能统计")
+        st.write({
+            "样本数": d.get('count', 0),
+            "平均耗时ms": d.get('avg', 0.0),
+            "P95耗时ms": d.get('p95', 0.0),
+            "最大耗时ms": d.get('max', 0.0)
+        })
     except Exception:
         pass
     if malicious > 0:
         st.subheader("恶意样例")
-        for h in hist:
-            res = h.get('result', {})
-            if res.get('status') == 'failed':
-                st.write({"time": h.get('timestamp'), "symptom": h.get('symptom')[:60], "reason": res.get('error_message')})
+        for h in malicious_samples:
+            st.write({"time": h.get('timestamp'), "symptom": h.get('symptom')[:60], "reason": h['result'].get('error_message')})
 
 with tab4:
     st.subheader("📈 年龄与疾病概率分布")
@@ -0,0 +1,99 @@
+"""测试批量日志处理器"""
+import io
+import logging
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.enhanced_logger import BatchingHandler, BatchingFileHandler
+
+
+class CountingStream(io.StringIO):
+    """记录write调用次数的内存流"""
+
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, s):
+        self.writes += 1
+        return super().write(s)
+
+
+def _record(msg, level=logging.INFO):
+    return logging.LogRecord("test", level, __file__, 0, msg, (), None)
+
+
+def _handler(stream, **kwargs):
+    # 定时刷新间隔设得足够长，测试中只由容量、级别或显式flush触发输出
+    handler = BatchingHandler(stream, interval=3600, **kwargs)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    return handler
+
+
+def test_batch_written_in_one_write():
+    """缓冲中的多条记录在flush时一次写出"""
+    stream = CountingStream()
+    handler = _handler(stream)
+    for i in range(50):
+        handler.emit(_record(f"msg {i}"))
+    assert stream.writes == 0
+    handler.flush()
+    assert stream.writes == 1
+    assert stream.getvalue().splitlines() == [f"msg {i}" for i in range(50)]
+
+
+def test_flush_on_capacity():
+    """达到容量时立即输出"""
+    stream = CountingStream()
+    handler = _handler(stream, capacity=10)
+    for i in range(25):
+        handler.emit(_record(f"msg {i}"))
+    assert stream.writes == 2
+    assert len(stream.getvalue().splitlines()) == 20
+
+
+def test_error_flushes_immediately():
+    """ERROR级别的记录连同之前缓冲的记录立即输出"""
+    stream = CountingStream()
+    handler = _handler(stream)
+    handler.emit(_record("info"))
+    handler.emit(_record("boom", logging.ERROR))
+    assert stream.writes == 1
+    assert stream.getvalue().splitlines() == ["info", "boom"]
+
+
+def test_write_error_reported():
+    """写入失败时通过handleError报告，而不是静默丢弃"""
+
+    class FullDisk(io.StringIO):
+        def write(self, s):
+            raise OSError(28, "No space left on device")
+
+    handler = _handler(FullDisk())
+    reported = []
+    handler.handleError = reported.append
+    handler.emit(_record("lost"))
+    handler.flush()
+    assert len(reported) == 1
+
+
+def test_file_handler_flush_and_close():
+    """文件处理器close时写出剩余记录并关闭文件"""
+    path = os.path.join(tempfile.mkdtemp(), "test.log")
+    handler = BatchingFileHandler(path, interval=3600)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    handler.emit(_record("first"))
+    handler.emit(_record("second"))
+    handler.close()
+    assert handler.stream.closed
+    with open(path, encoding="utf-8") as f:
+        assert f.read().splitlines() == ["first", "second"]
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"✅ {name}")
@@ -0,0 +1,98 @@
+"""测试查询统计服务"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.query_stats_service import QueryStatsService
+
+
+def _entry(status, **durations):
+    return {'result': {'status': status}, **durations}
+
+
+def _stats(entries, **kwargs):
+    service = QueryStatsService(**kwargs)
+    service.extend(entries)
+    return service.snapshot()
+
+
+def test_status_counts():
+    """各状态计入对应的桶，未知状态只计入总数"""
+    entries = [
+        _entry('success'), _entry('success'), _entry('no_match'),
+        _entry('failed'), _entry('error'), _entry('unknown'), {'result': None},
+    ]
+    counts = _stats(entries)['counts']
+    assert counts == {'normal': 2, 'malicious_or_error': 2, 'non_medical': 1, 'total': 7}
+
+
+def test_p95_and_max():
+    """P95与最大值与排序后按下标取值的结果一致"""
+    values = [(i * 37) % 101 + 1 for i in range(200)]
+    stats = _stats([_entry('success', total_duration_ms=v) for v in values])
+    ordered = sorted(values)
+    durations = stats['durations_ms']
+    assert durations['count'] == 200
+    assert durations['p95'] == ordered[int(0.95 * 199)]
+    assert durations['max'] == ordered[-1]
+    assert durations['avg'] == round(sum(values) / 200, 2)
+
+
+def test_duration_fallback_and_zero():
+    """total_duration_ms为0时不回退到其他字段，缺失时依次回退"""
+    stats = _stats([
+        _entry('success', total_duration_ms=0, duration_ms=500),
+        _entry('success', duration_ms=10),
+        _entry('success', server_duration_ms=20),
+    ])
+    assert stats['durations_ms']['count'] == 3
+    assert stats['durations_ms']['max'] == 20
+
+
+def test_string_and_bool_durations():
+    """数字字符串按数值统计，非法字符串与布尔值被忽略"""
+    stats = _stats([
+        _entry('success', total_duration_ms='12.5'),
+        _entry('success', total_duration_ms='abc'),
+        _entry('success', total_duration_ms=True),
+        _entry('success', total_duration_ms=None),
+    ])
+    assert stats['durations_ms']['count'] == 1
+    assert stats['durations_ms']['max'] == 12.5
+
+
+def test_empty():
+    stats = _stats([])
+    assert stats['counts']['total'] == 0
+    assert stats['durations_ms'] == {'count': 0, 'avg': 0.0, 'p95': 0.0, 'max': 0.0}
+
+
+def test_counts_all_time_p95_windowed():
+    """计数、平均与最大值覆盖全部历史，P95只看最近window条耗时"""
+    entries = [_entry('success', total_duration_ms=1000)] + [_entry('failed', total_duration_ms=v) for v in (1, 2, 3)]
+    stats = _stats(entries, window=3)
+    assert stats['counts'] == {'normal': 1, 'malicious_or_error': 3, 'non_medical': 0, 'total': 4}
+    assert stats['durations_ms']['count'] == 4
+    assert stats['durations_ms']['max'] == 1000
+    assert stats['durations_ms']['avg'] == 251.5
+    assert stats['durations_ms']['p95'] == 2
+
+
+def test_incremental_extend_and_cache():
+    """增量计入与一次性计入结果一致；无新记录时复用上次结果，reset后重新累计"""
+    entries = [_entry('success', total_duration_ms=v) for v in range(1, 51)]
+    service = QueryStatsService()
+    service.extend(entries[:20])
+    first = service.snapshot()
+    assert service.snapshot() is first
+    service.extend(entries[20:])
+    assert service.snapshot() == _stats(entries)
+    service.reset()
+    assert service.snapshot()['counts']['total'] == 0
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"✅ {name}")
@@ -12,10 +12,13 @@
 5. 错误和异常详细追踪
 """
 
+import atexit
 import logging
-import os
+import logging.handlers
 import sys
 import json
+import queue
+import threading
 import time
 from datetime import datetime
 from pathlib import Path
@@ -23,6 +26,152 @@ from typing import Dict, Any, Optional, List
 from functools import wraps
 import traceback
 
+try:
+    import orjson
+
+    def _dumps(obj: Any) -> str:
+        """序列化日志内容（orjson实现）"""
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+except ImportError:
+    def _dumps(obj: Any) -> str:
+        """序列化日志内容（标准库降级实现）"""
+        return json.dumps(obj, ensure_ascii=False)
+
+# 文件日志缓冲条数与定时刷新间隔（秒）
+FILE_BUFFER_CAPACITY = 512
+FILE_FLUSH_INTERVAL = 0.2
+# 控制台日志定时输出间隔（秒）
+CONSOLE_FLUSH_INTERVAL = 0.05
+
+# 需要脱敏的字段
+SENSITIVE_FIELDS = frozenset({
+    'password', 'secret', 'token', 'key', 'api_key',
+    'phone', 'email', 'id_card', 'bank_card'
+})
+
+# 每个日志记录器名称对应的后台监听器，只启动一次
+_queue_listeners: Dict[str, logging.handlers.QueueListener] = {}
+
+# 最近一次生成的时间戳 (毫秒, ISO字符串)
+_last_iso = (0, "")
+
+
+def _now_iso() -> str:
+    """返回毫秒精度的ISO时间戳，同一毫秒内复用已格式化的字符串"""
+    global _last_iso
+    ms = time.time_ns() // 1_000_000
+    cached = _last_iso
+    if cached[0] != ms:
+        cached = (ms, datetime.fromtimestamp(ms / 1000).isoformat(timespec='milliseconds'))
+        _last_iso = cached
+    return cached[1]
+
+
+def _start_flush_timer(handler: logging.Handler, interval: float):
+    """后台定时刷新缓冲处理器，保证低流量时日志也能及时落盘"""
+    def _run():
+        while True:
+            time.sleep(interval)
+            handler.flush()
+    
+    threading.Thread(target=_run, name="medical-log-flush", daemon=True).start()
+
+
+def _serialize_payload(record: logging.LogRecord):
+    """序列化extra中的payload并缓存在记录上，多个处理器共享同一结果"""
+    payload = getattr(record, "payload", None)
+    if payload is None or getattr(record, "payload_json", None) is not None:
+        return
+    try:
+        record.payload_json = _dumps(payload)
+    except Exception:
+        # 不可序列化时退回字符串表示
+        record.payload_json = str(payload)
+
+
+class PayloadQueueHandler(logging.handlers.QueueHandler):
+    """入队前在调用线程上序列化payload，日志记录的是调用时的数据而非写出时的数据"""
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        _serialize_payload(record)
+        return super().prepare(record)
+
+
+class StructuredFormatter(logging.Formatter):
+    """结构化日志格式器：输出为 "标签: {JSON}"，payload由PayloadQueueHandler在调用线程序列化"""
+    
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        if getattr(record, "payload", None) is not None:
+            # 未经队列直接交给处理器的记录在此补做序列化
+            _serialize_payload(record)
+            record.message = f"{record.message}: {record.payload_json}"
+        return super().formatMessage(record)
+
+
+class BatchingHandler(logging.StreamHandler):
+    """批量输出处理器：格式化后的记录先缓存，定时或达到阈值时一次写出"""
+    
+    def __init__(self, stream=None, capacity: int = 256, interval: float = 0.05,
+                 flush_level: int = logging.ERROR):
+        """
+        Args:
+            stream: 输出流，默认sys.stderr
+            capacity: 缓存条数达到该值时立即输出
+            interval: 定时输出间隔（秒）
+            flush_level: 达到该级别的记录立即输出
+        """
+        super().__init__(stream)
+        self.capacity = capacity
+        self.flush_level = flush_level
+        self._buffer: List[str] = []
+        self._buffer_lock = threading.Lock()
+        _start_flush_timer(self, interval)
+    
+    def emit(self, record: logging.LogRecord):
+        try:
+            msg = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        with self._buffer_lock:
+            self._buffer.append(msg)
+            should_flush = len(self._buffer) >= self.capacity or record.levelno >= self.flush_level
+        if should_flush:
+            self.flush()
+    
+    def flush(self):
+        with self._buffer_lock:
+            batch, self._buffer = self._buffer, []
+        if not batch:
+            return
+        self.acquire()
+        try:
+            self.stream.write(self.terminator.join(batch) + self.terminator)
+            self.stream.flush()
+        except Exception:
+            # 与标准库处理器一致，写入失败（如磁盘已满）时报告错误而不是静默丢弃
+            self.handleError(logging.makeLogRecord({
+                "msg": "failed to write %d buffered log records", "args": (len(batch),)
+            }))
+        finally:
+            self.release()
+
+
+class BatchingFileHandler(BatchingHandler):
+    """批量写入日志文件：一批记录格式化后以一次write写出"""
+    
+    def __init__(self, filename, encoding: str = 'utf-8', **kwargs):
+        super().__init__(open(filename, 'a', encoding=encoding), **kwargs)
+    
+    def close(self):
+        self.flush()
+        self.acquire()
+        try:
+            self.stream.close()
+        finally:
+            self.release()
+        super().close()
+
 
 class MedicalLogger:
     """医疗导诊系统专用日志记录器"""
@@ -55,36 +204,57 @@ class MedicalLogger:
         
         # 文件处理器 - 按日期分割
         log_file = log_dir / f"medical_{datetime.now().strftime('%Y%m%d')}.log"
-        file_handler = logging.FileHandler(log_file, encoding='utf-8')
+        # 批量写入 - 缓冲满、出现ERROR或定时刷新时一次写入文件
+        file_handler = BatchingFileHandler(
+            log_file, capacity=FILE_BUFFER_CAPACITY, interval=FILE_FLUSH_INTERVAL
+        )
+        
+        # 控制台处理器 - 批量输出
+        console_handler = BatchingHandler(sys.stdout, interval=CONSOLE_FLUSH_INTERVAL)
         
-        # 控制台处理器
-        console_handler = logging.StreamHandler(sys.stdout)
+        # 异步写日志 - 调用方只负责入队，格式化与I/O由后台监听线程完成
+        log_queue = queue.Queue(-1)
+        listener = logging.handlers.QueueListener(
+            log_queue, file_handler, console_handler, respect_handler_level=True
+        )
+        listener.start()
+        atexit.register(listener.stop)
+        _queue_listeners[self.logger.name] = listener
         
-        self.logger.addHandler(file_handler)
-        self.logger.addHandler(console_handler)
+        self.logger.addHandler(PayloadQueueHandler(log_queue))
     
     def _setup_formatters(self):
         """设置日志格式"""
         # 详细格式 - 用于文件
-        detailed_formatter = logging.Formatter(
+        detailed_formatter = StructuredFormatter(
             '%(asctime)s - %(name)s - %(levelname)s - '
             '[%(filename)s:%(lineno)d - %(funcName)s] - %(message)s'
         )
         
         # 简洁格式 - 用于控制台
-        simple_formatter = logging.Formatter(
+        simple_formatter = StructuredFormatter(
             '%(asctime)s - %(levelname)s - %(message)s'
         )
         
         # 为不同的处理器设置不同的格式
+        handlers = []
         for handler in self.logger.handlers:
-            if isinstance(handler, logging.FileHandler):
+            if isinstance(handler, logging.handlers.QueueHandler) and self.logger.name in _queue_listeners:
+                handlers.extend(_queue_listeners[self.logger.name].handlers)
+            else:
+                handlers.append(handler)
+        
+        for handler in handlers:
+            if isinstance(handler, (logging.FileHandler, BatchingFileHandler)):
                 handler.setFormatter(detailed_formatter)
             else:
                 handler.setFormatter(simple_formatter)
     
     def log_user_input(self, input_data: Dict[str, Any], source: str = "unknown"):
         """记录用户输入数据"""
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+        
         try:
             # 敏感信息脱敏
             safe_data = self._sanitize_data(input_data)
@@ -92,12 +262,12 @@ class MedicalLogger:
             log_entry = {
                 "type": "user_input",
                 "source": source,
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": _now_iso(),
                 "data": safe_data,
                 "data_size": len(str(input_data))
             }
             
-            self.info(f"USER_INPUT: {json.dumps(log_entry, ensure_ascii=False)}")
+            self.info("USER_INPUT", extra={"payload": log_entry})
             
         except Exception as e:
             self.error(f"Failed to log user input: {str(e)}")
@@ -105,36 +275,44 @@ class MedicalLogger:
     def log_llm_call(self, prompt: str, response: str, model: str = "unknown", 
                     tokens_used: Optional[int] = None, duration: Optional[float] = None):
         """记录大模型调用完整信息"""
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+        
         try:
+            prompt_length = len(prompt)
+            response_length = len(response)
             log_entry = {
                 "type": "llm_call",
                 "model": model,
-                "timestamp": datetime.now().isoformat(),
-                "prompt_length": len(prompt),
-                "response_length": len(response),
+                "timestamp": _now_iso(),
+                "prompt_length": prompt_length,
+                "response_length": response_length,
                 "tokens_used": tokens_used,
                 "duration_seconds": duration,
-                "prompt_preview": prompt[:200] + "..." if len(prompt) > 200 else prompt,
-                "response_preview": response[:200] + "..." if len(response) > 200 else response
+                "prompt_preview": prompt[:200] + "..." if prompt_length > 200 else prompt,
+                "response_preview": response[:200] + "..." if response_length > 200 else response
             }
             
-            self.info(f"LLM_CALL: {json.dumps(log_entry, ensure_ascii=False)}")
+            self.info("LLM_CALL", extra={"payload": log_entry})
             
         except Exception as e:
             self.error(f"Failed to log LLM call: {str(e)}")
     
     def log_process_step(self, step_name: str, status: str, details: Dict[str, Any] = None):
         """记录关键流程节点状态"""
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+        
         try:
             log_entry = {
                 "type": "process_step",
                 "step_name": step_name,
                 "status": status,
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": _now_iso(),
                 "details": details or {}
             }
             
-            self.info(f"PROCESS_STEP: {json.dumps(log_entry, ensure_ascii=False)}")
+            self.info("PROCESS_STEP", extra={"payload": log_entry})
             
         except Exception as e:
             self.error(f"Failed to log process step: {str(e)}")
@@ -142,14 +320,14 @@ class MedicalLogger:
     def start_timer(self, timer_name: str):
         """开始性能计时"""
         self.performance_timers[timer_name] = time.time()
-        self.debug(f"Started timer: {timer_name}")
+        self.logger.debug("Started timer: %s", timer_name)
     
     def end_timer(self, timer_name: str) -> float:
         """结束性能计时并返回耗时"""
         if timer_name in self.performance_timers:
             duration = time.time() - self.performance_timers[timer_name]
             del self.performance_timers[timer_name]
-            self.info(f"Timer {timer_name} completed in {duration:.3f} seconds")
+            self.logger.info("Timer %s completed in %.3f seconds", timer_name, duration)
             return duration
         else:
             self.warning(f"Timer {timer_name} not found")
@@ -157,51 +335,51 @@ class MedicalLogger:
     
     def log_error_with_context(self, error: Exception, context: Dict[str, Any] = None):
         """记录带上下文的错误信息"""
+        if not self.logger.isEnabledFor(logging.ERROR):
+            return
+        
         try:
             error_info = {
                 "type": "error_with_context",
                 "error_type": type(error).__name__,
                 "error_message": str(error),
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": _now_iso(),
                 "traceback": traceback.format_exc(),
                 "context": context or {}
             }
             
-            self.error(f"ERROR_CONTEXT: {json.dumps(error_info, ensure_ascii=False)}")
+            self.error("ERROR_CONTEXT", extra={"payload": error_info})
             
         except Exception as e:
             self.error(f"Failed to log error with context: {str(e)}")
     
     def log_performance_metrics(self, operation: str, metrics: Dict[str, Any]):
         """记录性能指标"""
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+        
         try:
             log_entry = {
                 "type": "performance_metrics",
                 "operation": operation,
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": _now_iso(),
                 "metrics": metrics
             }
             
-            self.info(f"PERFORMANCE: {json.dumps(log_entry, ensure_ascii=False)}")
+            self.info("PERFORMANCE", extra={"payload": log_entry})
             
         except Exception as e:
             self.error(f"Failed to log performance metrics: {str(e)}")
     
     def _sanitize_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """敏感信息脱敏处理"""
-        # 复制数据避免修改原数据
-        safe_data = data.copy()
-        
-        # 定义敏感字段
-        sensitive_fields = [
-            'password', 'secret', 'token', 'key', 'api_key', 
-            'phone', 'email', 'id_card', 'bank_card'
-        ]
-        
-        for field in sensitive_fields:
-            if field in safe_data:
-                safe_data[field] = "[REDACTED]"
+        hits = SENSITIVE_FIELDS & data.keys()
+        if not hits:
+            return data
         
+        # 仅在需要脱敏时复制，避免修改原数据
+        safe_data = dict(data)
+        safe_data.update(dict.fromkeys(hits, "[REDACTED]"))
         return safe_data
     
     def debug(self, message: str, extra: Optional[Dict[str, Any]] = None):
@@ -230,24 +408,28 @@ def log_process_step(step_name: str):
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            logger = MedicalLogger()
-            logger.log_process_step(step_name, "started", {
-                "function": func.__name__,
-                "args_count": len(args),
-                "kwargs_count": len(kwargs)
-            })
+            # 复用全局日志实例；INFO未启用时跳过日志内容构建
+            enabled = logger.logger.isEnabledFor(logging.INFO)
+            if enabled:
+                logger.log_process_step(step_name, "started", {
+                    "function": func.__name__,
+                    "args_count": len(args),
+                    "kwargs_count": len(kwargs)
+                })
             
             try:
                 result = func(*args, **kwargs)
-                logger.log_process_step(step_name, "completed", {
-                    "function": func.__name__
-                })
+                if enabled:
+                    logger.log_process_step(step_name, "completed", {
+                        "function": func.__name__
+                    })
                 return result
             except Exception as e:
-                logger.log_process_step(step_name, "failed", {
-                    "function": func.__name__,
-                    "error": str(e)
-                })
+                if enabled:
+                    logger.log_process_step(step_name, "failed", {
+                        "function": func.__name__,
+                        "error": str(e)
+                    })
                 raise
         
         return wrapper
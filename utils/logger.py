@@ -13,7 +13,6 @@
 """
 
 import logging
-import os
 import sys
 from datetime import datetime
 from pathlib import Path
@@ -94,6 +93,8 @@ class SystemLogger:
     def _log(self, level: int, message: str, extra: Optional[Dict[str, Any]],
              source_file: Optional[str], source_module: Optional[str]):
         """内部日志记录方法"""
+        if not self.logger.isEnabledFor(level):
+            return
         if extra is None:
             extra = {}
         
@@ -2,6 +2,7 @@
 from langchain.output_parsers import PydanticOutputParser, OutputFixingParser
 from langchain.chat_models import ChatOpenAI
 from models.medical_models import MedicalAdviceResponse
+import logging
 import os
 from utils.enhanced_logger import logger
 
@@ -11,15 +12,16 @@ class MedicalOutputParser:
     def __init__(self):
         logger.log_process_step("output_parser_init", "started")
         
+        # 获取LLM配置（只读取一次环境变量；不在导入时读取，以便app.py中的load_dotenv生效）
+        model_name = os.getenv("DEEPSEEK_MODEL", "deepseek-chat")
+        api_key = os.getenv("DEEPSEEK_API_KEY")
+        base_url = os.getenv("DEEPSEEK_API_URL")
+        self._cached_instructions = None
+        
         try:
             # 创建基础解析器
             self.base_parser = PydanticOutputParser(pydantic_object=MedicalAdviceResponse)
             
-            # 获取LLM配置
-            model_name = os.getenv("DEEPSEEK_MODEL", "deepseek-chat")
-            api_key = os.getenv("DEEPSEEK_API_KEY")
-            base_url = os.getenv("DEEPSEEK_API_URL")
-            
             logger.log_process_step("output_parser_config", "loading", {
                 "model": model_name,
                 "has_api_key": bool(api_key),
@@ -50,18 +52,21 @@ class MedicalOutputParser:
         except Exception as e:
             logger.log_error_with_context(e, {
                 "function": "__init__",
-                "model": os.getenv("DEEPSEEK_MODEL"),
-                "has_api_key": bool(os.getenv("DEEPSEEK_API_KEY"))
+                "model": model_name,
+                "has_api_key": bool(api_key)
             })
             self.fixing_parser = None
     
     def get_format_instructions(self) -> str:
         """获取格式指令"""
+        if self._cached_instructions is not None:
+            return self._cached_instructions
         try:
             instructions = self.base_parser.get_format_instructions()
             logger.log_process_step("get_format_instructions", "completed", {
                 "instructions_length": len(instructions)
             })
+            self._cached_instructions = instructions
             return instructions
         except Exception as e:
             logger.log_error_with_context(e, {
@@ -78,10 +83,11 @@ class MedicalOutputParser:
     
     async def parse_advice(self, llm_output: str) -> MedicalAdviceResponse:
         """解析LLM输出，自动修复格式错误"""
-        logger.log_process_step("parse_advice", "started", {
-            "output_length": len(llm_output),
-            "output_preview": llm_output[:200] + "..." if len(llm_output) > 200 else llm_output
-        })
+        if logger.logger.isEnabledFor(logging.INFO):
+            logger.log_process_step("parse_advice", "started", {
+                "output_length": len(llm_output),
+                "output_preview": llm_output[:200] + "..." if len(llm_output) > 200 else llm_output
+            })
         
         try:
             # 首先尝试基础解析
@@ -1,5 +1,23 @@
+import logging
+import sys
+
 from utils.logger import get_logger
 
+# 分隔线常量，模块加载时构建一次
+_SEP50 = "=" * 50
+_SEP60 = "=" * 60
+_DASH30 = "-" * 30
+_DASH40 = "-" * 40
+_HDR50 = "\n" + _SEP50
+_FTR50 = _SEP50 + "\n"
+_HDR60 = "\n" + _SEP60
+_FTR60 = _SEP60 + "\n"
+
+
+def _write_lines(lines: list):
+    """一次性写出多行文本，避免逐行print产生多次写调用"""
+    sys.stdout.write("\n".join(lines) + "\n")
+
 
 class DiseaseView:
     """疾病视图类，负责显示疾病信息给用户"""
@@ -15,38 +33,42 @@ class DiseaseView:
             print("未找到该疾病信息")
             return
         
-        self.logger.info(f"显示疾病信息: {disease_info.get('disease_id', '未知')}", 
-                       source_file=__file__, source_module="DiseaseView")
+        # SystemLogger不支持%s延迟格式化，级别未启用时跳过消息拼接
+        if self.logger.logger.isEnabledFor(logging.INFO):
+            self.logger.info(f"显示疾病信息: {disease_info.get('disease_id', '未知')}", 
+                           source_file=__file__, source_module="DiseaseView")
         
-        print("\n" + "="*50)
-        print(f"疾病名称: {disease_info.get('name', '未知')}")
-        print(f"症候ID: {disease_info.get('disease_id', '未知')}")
-        print("-" * 30)
+        lines = [
+            _HDR50,
+            f"疾病名称: {disease_info.get('name', '未知')}",
+            f"症候ID: {disease_info.get('disease_id', '未知')}",
+            _DASH30,
+        ]
         
         # 显示症状信息
         symptoms = disease_info.get('related_symptoms', [])
         if symptoms:
-            print("关联症状:")
-            for symptom in symptoms:
-                print(f"  - {symptom}")
+            lines.append("关联症状:")
+            lines.extend(f"  - {symptom}" for symptom in symptoms)
         
         # 显示指南信息
         urgency = disease_info.get('urgency')
         recommended_action = disease_info.get('recommended_action')
         
         if urgency and recommended_action:
-            print("-" * 30)
-            print(f"紧急程度: {urgency}")
-            print(f"建议行动: {recommended_action}")
+            lines.append(_DASH30)
+            lines.append(f"紧急程度: {urgency}")
+            lines.append(f"建议行动: {recommended_action}")
         
         # 显示附加信息
         special_notes = disease_info.get('special_notes')
         if special_notes:
-            print("-" * 30)
-            print("⚠️  风险提示与附加信息:")
-            print(f"  {special_notes}")
+            lines.append(_DASH30)
+            lines.append("⚠️  风险提示与附加信息:")
+            lines.append(f"  {special_notes}")
         
-        print("="*50 + "\n")
+        lines.append(_FTR50)
+        _write_lines(lines)
     
     @staticmethod
     def display_guideline_info(guideline_info: dict):
@@ -55,11 +77,13 @@ class DiseaseView:
             print("未找到该疾病的医疗指南")
             return
         
-        print("\n" + "="*50)
-        print(f"疾病ID: {guideline_info.get('disease_id', '未知')}")
-        print(f"紧急程度: {guideline_info.get('urgency', '未知')}")
-        print(f"建议行动: {guideline_info.get('recommended_action', '未知')}")
-        print("="*50 + "\n")
+        _write_lines([
+            _HDR50,
+            f"疾病ID: {guideline_info.get('disease_id', '未知')}",
+            f"紧急程度: {guideline_info.get('urgency', '未知')}",
+            f"建议行动: {guideline_info.get('recommended_action', '未知')}",
+            _FTR50,
+        ])
     
     @staticmethod
     def display_disease_list(diseases: list):
@@ -68,14 +92,13 @@ class DiseaseView:
             print("未找到任何疾病信息")
             return
         
-        print("\n" + "="*50)
-        print("疾病列表:")
-        print("-" * 30)
-        
-        for i, disease in enumerate(diseases, 1):
-            print(f"{i}. {disease.get('name', '未知')} (ID: {disease.get('disease_id', '未知')})")
-        
-        print("="*50 + "\n")
+        lines = [_HDR50, "疾病列表:", _DASH30]
+        lines.extend(
+            f"{i}. {disease.get('name', '未知')} (ID: {disease.get('disease_id', '未知')})"
+            for i, disease in enumerate(diseases, 1)
+        )
+        lines.append(_FTR50)
+        _write_lines(lines)
     
     @staticmethod
     def display_search_results(diseases: list, symptom: str):
@@ -84,13 +107,13 @@ class DiseaseView:
             print(f"未找到包含症状 '{symptom}' 的疾病")
             return
         
-        print(f"\n找到 {len(diseases)} 个包含症状 '{symptom}' 的疾病:")
-        print("="*50)
-        
-        for i, disease in enumerate(diseases, 1):
-            print(f"{i}. {disease.get('name', '未知')} (ID: {disease.get('disease_id', '未知')})")
-        
-        print("="*50 + "\n")
+        lines = [f"\n找到 {len(diseases)} 个包含症状 '{symptom}' 的疾病:", _SEP50]
+        lines.extend(
+            f"{i}. {disease.get('name', '未知')} (ID: {disease.get('disease_id', '未知')})"
+            for i, disease in enumerate(diseases, 1)
+        )
+        lines.append(_FTR50)
+        _write_lines(lines)
     
     @staticmethod
     def display_emergency_guidelines(guidelines: list):
@@ -99,14 +122,12 @@ class DiseaseView:
             print("暂无紧急医疗指南")
             return
         
-        print("\n" + "="*60)
-        print("⚠️  紧急医疗指南 ⚠️")
-        print("="*60)
-        
+        lines = [_HDR60, "⚠️  紧急医疗指南 ⚠️", _SEP60]
         for guideline in guidelines:
-            print(f"\n疾病ID: {guideline.get('disease_id', '未知')}")
-            print(f"紧急程度: {guideline.get('urgency', '未知')}")
-            print(f"建议行动: {guideline.get('recommended_action', '未知')}")
-            print("-" * 40)
+            lines.append(f"\n疾病ID: {guideline.get('disease_id', '未知')}")
+            lines.append(f"紧急程度: {guideline.get('urgency', '未知')}")
+            lines.append(f"建议行动: {guideline.get('recommended_action', '未知')}")
+            lines.append(_DASH40)
         
-        print("="*60 + "\n")
\ No newline at end of file
+        lines.append(_FTR60)
+        _write_lines(lines)